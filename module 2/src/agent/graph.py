@@ -5,7 +5,7 @@ from langchain_openai import AzureChatOpenAI
 from langgraph.graph import StateGraph, START, END
 from typing import Annotated
 from langgraph.graph.message import add_messages
-from langchain_core.runnables import RunnableConfig
+from langchain_core.runnables import RunnableConfig, RunnableLambda
 
 # State definition
 class State(TypedDict):
@@ -17,8 +17,8 @@ model = AzureChatOpenAI(
     api_version="2025-01-01-preview"
 )
 
-# Define the logic to call the model
-def call_model(state: State, config: RunnableConfig):
+# Build the messages sent to the model
+def conversation_messages(state: State):
 
     # Get summary if it exists
     summary = state.get("summary", "")
@@ -28,15 +28,21 @@ def call_model(state: State, config: RunnableConfig):
         # Add summary to system message
         system_message = f"Summary of conversation earlier: {summary}"
         # Append summary to any newer messages
-        messages = [SystemMessage(content=system_message)] + state["messages"]
-    else:
-        messages = state["messages"]
-    
-    response = model.invoke(messages, config)
+        return [SystemMessage(content=system_message)] + state["messages"]
+    return state["messages"]
+
+# Define the logic to call the model
+def call_model(state: State, config: RunnableConfig):
+    response = model.invoke(conversation_messages(state), config)
     return {"messages": response}
 
-# Define summarization function
-def summarize_conversation(state: State):
+# Async variant, used when the graph runs with ainvoke/astream
+async def acall_model(state: State, config: RunnableConfig):
+    response = await model.ainvoke(conversation_messages(state), config)
+    return {"messages": response}
+
+# Build the summarization prompt on top of the history
+def summarization_messages(state: State):
     
     # First, we get any existing summary
     summary = state.get("summary", "")
@@ -52,13 +58,24 @@ def summarize_conversation(state: State):
         summary_message = "Create a summary of the conversation above:"
 
     # Add prompt to our history
-    messages = state["messages"] + [HumanMessage(content=summary_message)]
-    response = model.invoke(messages)
+    return state["messages"] + [HumanMessage(content=summary_message)]
+
+# Store the new summary and trim the history it now covers
+def summary_update(state: State, response):
     
     # Delete all but the 2 most recent messages
     delete_messages = [RemoveMessage(id=m.id) for m in state["messages"][:-2]]
     return {"summary": response.content, "messages": delete_messages}
 
+# Define summarization function
+def summarize_conversation(state: State):
+    response = model.invoke(summarization_messages(state))
+    return summary_update(state, response)
+
+async def asummarize_conversation(state: State, config: RunnableConfig):
+    response = await model.ainvoke(summarization_messages(state), config)
+    return summary_update(state, response)
+
 # Determine whether to end or summarize the conversation
 def should_continue(state: State) -> Literal["summarize_conversation", END]:
     """Return the next node to execute."""
@@ -73,8 +90,8 @@ def should_continue(state: State) -> Literal["summarize_conversation", END]:
 
 # Define a new graph
 workflow = StateGraph(State)
-workflow.add_node("conversation", call_model)
-workflow.add_node("summarize_conversation", summarize_conversation)
+workflow.add_node("conversation", RunnableLambda(call_model, afunc=acall_model, name="conversation"))
+workflow.add_node("summarize_conversation", RunnableLambda(summarize_conversation, afunc=asummarize_conversation, name="summarize_conversation"))
 
 # Set the entrypoint as conversation
 workflow.add_edge(START, "conversation")
@@ -0,0 +1,87 @@
+"""Benchmark: concurrent summarize sessions on one event loop, sync vs async nodes.
+
+"before" builds the hitl graph with the plain `summarize_doc` node, which
+LangGraph has to push onto the default thread pool under `ainvoke`; "after"
+uses the graph from hitl_project, whose summarize node has the `ainvoke`
+variant. Both use FakeChatModel so only scheduling is measured.
+
+Run from module3/:
+    python benchmark_async.py --levels 8 32 128 512 --llm-latency 0.2
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import time
+import uuid
+
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.memory import MemorySaver
+
+from doc_store import doc_store
+from fake_llm import use_fake_backend
+
+
+async def run_session(app, session_id: int, feedback_rounds: int) -> float:
+    """Run one session (start plus feedback rounds) and return its duration in seconds."""
+    start = time.perf_counter()
+    thread = {"configurable": {"thread_id": str(uuid.uuid4())}}
+    await app.ainvoke({"doc_ref": doc_store.put(f"Tài liệu số {session_id}. " * 50)}, thread)
+    for i in range(feedback_rounds):
+        await app.ainvoke({"messages": [HumanMessage(content=f"Refine lại tóm tắt: lần {i + 1}")]}, thread)
+    return time.perf_counter() - start
+
+
+async def run_level(app, concurrency: int, feedback_rounds: int) -> dict:
+    """Run `concurrency` sessions at once and return throughput and latency percentiles."""
+    start = time.perf_counter()
+    latencies = sorted(await asyncio.gather(*(run_session(app, i, feedback_rounds) for i in range(concurrency))))
+    elapsed = time.perf_counter() - start
+    return {
+        "concurrency": concurrency,
+        "elapsed_s": elapsed,
+        "sessions_per_s": concurrency / elapsed,
+        "p50_s": latencies[len(latencies) // 2],
+        "p95_s": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+    }
+
+
+def main(argv=None) -> dict:
+    """Benchmark both graphs at each level, print a table and return the result."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 8, 32, 128, 512], help="concurrent sessions to try")
+    parser.add_argument("--feedback-rounds", type=int, default=1, help="extra ainvoke calls per session")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="fake LLM delay in seconds")
+    parser.add_argument("--slo", type=float, default=2.0,
+                        help="a level is sustained while p95 stays under slo x the single-session latency")
+    parser.add_argument("--output", help="write the JSON result to this file")
+    args = parser.parse_args(argv)
+
+    hitl_project = use_fake_backend(args.llm_latency)
+    ideal = args.llm_latency * (1 + args.feedback_rounds)
+
+    result = {"llm_latency": args.llm_latency, "feedback_rounds": args.feedback_rounds, "slo_s": ideal * args.slo}
+    for name, app in (("before", hitl_project.build_graph(hitl_project.summarize_doc, MemorySaver())),
+                      ("after", hitl_project.app_graph)):
+        levels = []
+        for concurrency in args.levels:
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                levels.append(asyncio.run(run_level(app, concurrency, args.feedback_rounds)))
+        sustained = [lvl["concurrency"] for lvl in levels if lvl["p95_s"] <= result["slo_s"]]
+        result[name] = {"levels": levels, "max_sustained_concurrency": max(sustained, default=0)}
+
+    for name in ("before", "after"):
+        print(f"== {name} (max sustained concurrency: {result[name]['max_sustained_concurrency']})")  # noqa: T201
+        for lvl in result[name]["levels"]:
+            print(f"  c={lvl['concurrency']:<5} {lvl['sessions_per_s']:8.1f} sessions/s  "  # noqa: T201
+                  f"p50={lvl['p50_s']:.3f}s p95={lvl['p95_s']:.3f}s")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+    return result
+
+
+if __name__ == "__main__":
+    main()
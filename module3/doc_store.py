@@ -0,0 +1,175 @@
+"""Content-addressed store for document text referenced from graph state.
+
+Graph state only keeps the short hash returned by `DocumentStore.put`; nodes
+call `DocumentStore.get` when they build the prompt. Recent documents stay in
+memory, older or oversized ones are spilled to disk and read back via mmap.
+Both tiers are bounded: the least recently used documents are dropped from
+disk once the spill directory grows past `max_disk_bytes`, after which `get`
+raises KeyError for them.
+
+Without `spill_dir` each store spills to its own temporary directory, removed
+at exit. A `spill_dir` given explicitly (DOC_STORE_DIR) is reloaded on start
+and trimmed as if the store owned every file in it, so it must not be shared
+with another running process.
+"""
+
+import atexit
+import hashlib
+import mmap
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+DEFAULT_MAX_MEMORY_BYTES = 64 * 1024 * 1024
+DEFAULT_MAX_DISK_BYTES = 1024 * 1024 * 1024
+
+
+class DocumentStore:
+    """Keep document text keyed by its sha256, in memory with a disk spill tier."""
+
+    def __init__(
+        self,
+        spill_dir: Optional[str] = None,
+        max_memory_bytes: int = DEFAULT_MAX_MEMORY_BYTES,
+        max_disk_bytes: int = DEFAULT_MAX_DISK_BYTES,
+    ) -> None:
+        """Create the store, spilling to `spill_dir` once `max_memory_bytes` is exceeded."""
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._memory: OrderedDict[str, bytes] = OrderedDict()
+        self._memory_bytes = 0
+        self._disk: OrderedDict[str, int] = OrderedDict()
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        if spill_dir is None:
+            self.spill_dir = tempfile.mkdtemp(prefix="doc_store-")
+            atexit.register(shutil.rmtree, self.spill_dir, ignore_errors=True)
+        else:
+            self.spill_dir = spill_dir
+            os.makedirs(spill_dir, exist_ok=True)
+            self._load_spilled()
+
+    def put(self, text: str) -> str:
+        """Store `text` and return its content hash (the reference kept in state)."""
+        data = text.encode("utf-8")
+        ref = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            if ref in self._memory:
+                self._memory.move_to_end(ref)
+                return ref
+            if ref in self._disk:
+                self._disk.move_to_end(ref)
+                return ref
+            if len(data) > self.max_memory_bytes:
+                self._spill(ref, data)
+                return ref
+            self._memory[ref] = data
+            self._memory_bytes += len(data)
+            self._evict()
+        return ref
+
+    def get(self, ref: str) -> str:
+        """Return the text stored under `ref`; raise KeyError if it is unknown or was dropped."""
+        with self._lock:
+            data = self._memory.get(ref)
+            if data is not None:
+                self._memory.move_to_end(ref)
+                return data.decode("utf-8")
+            if ref not in self._disk:
+                raise KeyError(ref)
+            self._disk.move_to_end(ref)
+        try:
+            with open(self._path(ref), "rb") as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return ""
+                # Decode straight from the mapped pages, without an intermediate bytes copy
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    return str(mm, "utf-8")
+        except FileNotFoundError:
+            with self._lock:
+                self._forget(ref)
+            raise KeyError(ref) from None
+
+    def delete(self, ref: str) -> None:
+        """Drop `ref` from both tiers; unknown refs are ignored."""
+        with self._lock:
+            data = self._memory.pop(ref, None)
+            if data is not None:
+                self._memory_bytes -= len(data)
+            self._unlink(ref)
+
+    def __contains__(self, ref: str) -> bool:
+        """Return True if `ref` is held in memory or its spill file still exists."""
+        with self._lock:
+            if ref in self._memory:
+                return True
+            if ref not in self._disk:
+                return False
+            if os.path.exists(self._path(ref)):
+                return True
+            self._forget(ref)
+            return False
+
+    def _path(self, ref: str) -> str:
+        return os.path.join(self.spill_dir, f"{ref}.txt")
+
+    def _load_spilled(self) -> None:
+        # Pick up files left by a previous run, oldest first so they are trimmed first
+        entries = []
+        for entry in os.scandir(self.spill_dir):
+            if entry.is_file() and entry.name.endswith(".txt"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, entry.name[: -len(".txt")], stat.st_size))
+        for _, ref, size in sorted(entries):
+            self._disk[ref] = size
+            self._disk_bytes += size
+        self._trim_disk()
+
+    def _spill(self, ref: str, data: bytes) -> None:
+        # Write to a temp file and rename so readers never see a partial file
+        path = self._path(ref)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        self._disk[ref] = len(data)
+        self._disk_bytes += len(data)
+        self._trim_disk(keep=ref)
+
+    def _forget(self, ref: str) -> bool:
+        # Bỏ ref khỏi index đĩa; file có thể đã bị xoá từ bên ngoài
+        size = self._disk.pop(ref, None)
+        if size is None:
+            return False
+        self._disk_bytes -= size
+        return True
+
+    def _unlink(self, ref: str) -> None:
+        if not self._forget(ref):
+            return
+        try:
+            os.remove(self._path(ref))
+        except FileNotFoundError:
+            pass
+
+    def _trim_disk(self, keep: Optional[str] = None) -> None:
+        for ref in list(self._disk):
+            if self._disk_bytes <= self.max_disk_bytes:
+                break
+            if ref != keep:
+                self._unlink(ref)
+
+    def _evict(self) -> None:
+        while self._memory_bytes > self.max_memory_bytes and self._memory:
+            ref, data = self._memory.popitem(last=False)
+            self._memory_bytes -= len(data)
+            self._spill(ref, data)
+
+
+doc_store = DocumentStore(
+    os.getenv("DOC_STORE_DIR"),
+    max_disk_bytes=int(os.getenv("DOC_STORE_MAX_DISK_BYTES", DEFAULT_MAX_DISK_BYTES)),
+)
@@ -0,0 +1,68 @@
+"""Local stand-in for AzureChatOpenAI used by load tests and benchmarks.
+
+Replies with a fixed text after a configurable delay, without any network
+access, so the numbers measure the graph and the HTTP service rather than the
+model provider.
+"""
+
+import asyncio
+import os
+import time
+from typing import Any, Optional
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model that waits `latency` seconds then answers with `response`."""
+
+    response: str = "Đây là bản tóm tắt giả lập."
+    latency: float = 0.05
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _result(self) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.response))])
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        time.sleep(self.latency)
+        return self._result()
+
+    async def _agenerate(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return self._result()
+
+
+def use_fake_backend(latency: float = 0.05):
+    """Import hitl_project with its LLM and its y/n CLI prompt replaced; return the module."""
+    # AzureChatOpenAI chỉ cần các biến này để khởi tạo, không gọi mạng
+    os.environ.setdefault("AZURE_OPENAI_API_KEY", "fake")
+    os.environ.setdefault("AZURE_OPENAI_ENDPOINT", "http://127.0.0.1")
+    os.environ.setdefault("OPENAI_API_VERSION", "2025-01-01-preview")
+
+    import hitl_project
+
+    hitl_project.llm = FakeChatModel(latency=latency)
+    # decide_next hỏi y/n qua input(); trả lời "n" để worker không bị chặn chờ stdin
+    hitl_project.input = lambda prompt="": "n"
+    return hitl_project
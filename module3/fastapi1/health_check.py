@@ -1,9 +1,18 @@
-from fastapi import FastAPI
-from pydantic import BaseModel
+from fastapi import Depends, FastAPI, Header, HTTPException
+from pydantic import BaseModel, Field
 from hitl_project import app_graph
+from doc_store import doc_store
+from request_tracing import start_trace, stop_trace
 from langchain_core.messages import HumanMessage
+from typing import Optional
+import asyncio
+import os
+import secrets
 import uuid
 
+# Tracing chỉ bật được khi có token; không đặt biến này thì header và /admin/tracing bị bỏ qua
+TRACE_ADMIN_TOKEN = os.getenv("TRACE_ADMIN_TOKEN")
+
 class HealthCheck(BaseModel):
     status: str = "OK"
 
@@ -18,7 +27,72 @@ class SubmitFeedbackRequest(BaseModel):
     thread_id: str
     feedback: str = ""
 
+class TracingSettings(BaseModel):
+    enabled: bool = False
+    profile: bool = False
+    sample_interval_ms: float = Field(default=5.0, gt=0, le=1000)
+
+tracing = TracingSettings()
+
+def valid_trace_token(token: Optional[str]) -> bool:
+    return token is not None and secrets.compare_digest(token.encode(), TRACE_ADMIN_TOKEN.encode())
+
+def trace_mode(scope) -> Optional[str]:
+    requested = token = None
+    for key, value in scope["headers"]:
+        if key == b"x-trace":
+            requested = value.decode("latin-1")
+        elif key == b"x-trace-token":
+            token = value.decode("latin-1")
+    if requested in ("1", "profile") and valid_trace_token(token):
+        return requested
+    if tracing.enabled:
+        return "profile" if tracing.profile else "1"
+    return None
+
+class TraceMiddleware:
+    """
+    Record a span tree for the request when asked to.
+
+    "X-Trace: 1" traces this request and "X-Trace: profile" also samples
+    stacks; both need "X-Trace-Token: $TRACE_ADMIN_TOKEN". POST /admin/tracing
+    turns the same on for every request. The trace file name is returned in
+    the X-Trace-File header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or TRACE_ADMIN_TOKEN is None:
+            return await self.app(scope, receive, send)
+        mode = trace_mode(scope)
+        if mode is None:
+            return await self.app(scope, receive, send)
+
+        profile_interval = tracing.sample_interval_ms / 1000 if mode == "profile" else None
+        trace = start_trace(f"{scope['method']} {scope['path']}", profile_interval)
+
+        async def send_with_trace_file(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), (b"x-trace-file", trace.file_name.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_trace_file)
+        finally:
+            stop_trace(trace)
+            # Dừng profiler, dựng event và ghi file đều chặn; chạy ngoài event loop
+            await asyncio.to_thread(trace.finish)
+
+def require_trace_token(x_trace_token: Optional[str] = Header(default=None)):
+    if TRACE_ADMIN_TOKEN is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not valid_trace_token(x_trace_token):
+        raise HTTPException(status_code=403, detail="Invalid X-Trace-Token")
+
 app = FastAPI()
+app.add_middleware(TraceMiddleware)
 
 @app.get("/health", response_model=HealthCheck)
 def health_check():
@@ -27,20 +101,39 @@ def health_check():
     """
     return HealthCheck(status="OK")
 
+@app.get("/admin/tracing", response_model=TracingSettings, dependencies=[Depends(require_trace_token)])
+def get_tracing():
+    return tracing
+
+@app.post("/admin/tracing", response_model=TracingSettings, dependencies=[Depends(require_trace_token)])
+def set_tracing(settings: TracingSettings):
+    """
+    Turn per-request trace export on or off for all requests.
+    """
+    global tracing
+    tracing = settings
+    return tracing
+
 @app.post("/start-summarize/", response_model=SummarizeResponse)
 async def start_summarize(request: StartSummarizeRequest):
-    initial_state = {"messages": [HumanMessage(content=request.text)]}
+    initial_state = {"doc_ref": doc_store.put(request.text)}
     thread = {"configurable": {"thread_id": str(uuid.uuid4())}}
-    result = app_graph.invoke(initial_state, config=thread)
+    result = await app_graph.ainvoke(initial_state, config=thread)
     summary = result["messages"][-1].content
     return SummarizeResponse(summary=summary, thread_id=thread["configurable"]["thread_id"])
 
 @app.post("/submit-feedback/", response_model=SummarizeResponse)
 async def submit_feedback(request: SubmitFeedbackRequest):
-    
-    inputs = {"messages": [HumanMessage(content=f"Refine lại tóm tắt: {request.feedback}")]}
     thread = {"configurable": {"thread_id": request.thread_id}}
-    final_state = app_graph.invoke(inputs, config=thread)
+    snapshot = await app_graph.aget_state(thread)
+    doc_ref = snapshot.values.get("doc_ref")
+    if doc_ref is None:
+        raise HTTPException(status_code=404, detail="Unknown thread_id")
+    if doc_ref not in doc_store:
+        raise HTTPException(status_code=404, detail="Document for this thread is no longer available")
+
+    inputs = {"messages": [HumanMessage(content=f"Refine lại tóm tắt: {request.feedback}")]}
+    final_state = await app_graph.ainvoke(inputs, config=thread)
 
     summary_message = final_state["messages"][-1].content
 
@@ -0,0 +1,359 @@
+"""Load test for the summarization service in health_check.py.
+
+Each session calls /start-summarize/ once and then /submit-feedback/ a few
+times on the same thread_id, like a user refining a summary. Sessions are
+driven either at a fixed concurrency (closed loop) or at a target session
+rate (open loop), and the run is summarised as JSON so results from
+different releases can be compared.
+
+Needs httpx, plus uvicorn for --mode localhost. RSS is read from psutil when
+installed, otherwise from /proc.
+
+Examples (run from module3/):
+    python fastapi1/load_test.py --mode inprocess --concurrency 20 --duration 30
+    python fastapi1/load_test.py --mode localhost --rate 5 --output run.json
+    python fastapi1/load_test.py --url http://127.0.0.1:8000 --concurrency 4
+"""
+
+import argparse
+import asyncio
+import contextlib
+import itertools
+import json
+import os
+import platform
+import socket
+import sys
+import threading
+import time
+from collections import defaultdict
+from typing import Optional
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ENDPOINTS = ("/start-summarize/", "/submit-feedback/")
+
+
+# ===============================
+# 1. Backend giả lập
+# ===============================
+def load_app(llm_latency: float):
+    """Import the FastAPI app with the LLM and the CLI prompt replaced by local fakes."""
+    from fake_llm import use_fake_backend
+
+    use_fake_backend(llm_latency)
+    from health_check import app
+
+    return app
+
+
+def free_port() -> int:
+    """Return a TCP port on 127.0.0.1 that is free right now."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class LocalServer:
+    """Run the app under uvicorn on 127.0.0.1 in a background thread."""
+
+    def __init__(self, app):
+        """Prepare a uvicorn server for `app` on a free port."""
+        import uvicorn
+
+        self.port = free_port()
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=self.port, log_level="warning"))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def __enter__(self) -> str:
+        """Start the server and return its base URL once it accepts connections."""
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        return f"http://127.0.0.1:{self.port}"
+
+    def __exit__(self, *exc) -> None:
+        """Ask the server to exit and wait for its thread."""
+        self.server.should_exit = True
+        self.thread.join()
+
+
+# ===============================
+# 2. Đo đạc
+# ===============================
+def current_rss_bytes() -> Optional[int]:
+    """Return this process's resident set size, or None if it cannot be read."""
+    try:
+        import psutil
+
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+def percentile(sorted_values: list[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, round(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class Recorder:
+    """Collect per-endpoint latencies, errors and RSS samples for one run."""
+
+    def __init__(self):
+        """Start an empty recording; elapsed time counts from here."""
+        # Chỉ request thành công; request lỗi nằm riêng để không làm lệch các percentile
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.error_latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self.rss: list[dict] = []
+        self.sessions_completed = 0
+        self.sessions_failed = 0
+        self.started_at = time.perf_counter()
+
+    def request(self, endpoint: str, seconds: float, error: Optional[str] = None) -> None:
+        """Record one request; `error` names the failure kind for failed ones."""
+        if error is None:
+            self.latencies[endpoint].append(seconds)
+        else:
+            self.error_latencies[endpoint].append(seconds)
+            self.errors[endpoint][error] += 1
+
+    async def sample_rss(self, interval: float) -> None:
+        """Append the current RSS every `interval` seconds until cancelled."""
+        while True:
+            self.rss.append({"t": round(time.perf_counter() - self.started_at, 3), "rss_bytes": current_rss_bytes()})
+            await asyncio.sleep(interval)
+
+    def summary(self, elapsed: float) -> dict:
+        """Return the run as a JSON-serialisable dict; latency and throughput cover successful requests only."""
+        endpoints = {}
+        total_requests = 0
+        total_ok = 0
+        total_errors = 0
+        for endpoint in ENDPOINTS:
+            values = sorted(self.latencies[endpoint])
+            errors = sum(self.errors[endpoint].values())
+            requests = len(values) + errors
+            total_requests += requests
+            total_ok += len(values)
+            total_errors += errors
+            endpoints[endpoint] = {
+                "requests": requests,
+                "errors": errors,
+                "error_rate": errors / requests if requests else 0.0,
+                "errors_by_kind": dict(self.errors[endpoint]),
+                "error_latency_max_s": max(self.error_latencies[endpoint], default=None),
+                "throughput_rps": len(values) / elapsed if elapsed else 0.0,
+                "latency_s": {
+                    "mean": sum(values) / len(values) if values else None,
+                    "p50": percentile(values, 50),
+                    "p95": percentile(values, 95),
+                    "p99": percentile(values, 99),
+                    "max": values[-1] if values else None,
+                },
+            }
+        rss_values = [s["rss_bytes"] for s in self.rss if s["rss_bytes"] is not None]
+        return {
+            "elapsed_s": elapsed,
+            "requests": total_requests,
+            "errors": total_errors,
+            "error_rate": total_errors / total_requests if total_requests else 0.0,
+            "throughput_rps": total_ok / elapsed if elapsed else 0.0,
+            "sessions_completed": self.sessions_completed,
+            "sessions_failed": self.sessions_failed,
+            "sessions_per_s": self.sessions_completed / elapsed if elapsed else 0.0,
+            "peak_rss_bytes": max(rss_values) if rss_values else None,
+            "endpoints": endpoints,
+            "rss_over_time": self.rss,
+        }
+
+
+# ===============================
+# 3. Kịch bản session
+# ===============================
+def make_document(session_id: int, size: int) -> str:
+    """Build a distinct document of roughly `size` characters."""
+    header = f"Tài liệu số {session_id}. "
+    filler = "Nội dung mẫu dùng cho kiểm thử tải. "
+    return header + filler * max(1, (size - len(header)) // len(filler))
+
+
+async def timed_post(client: httpx.AsyncClient, recorder: Recorder, endpoint: str, payload: dict) -> Optional[dict]:
+    """POST `payload` and record the outcome; return the JSON body, or None on failure."""
+    start = time.perf_counter()
+    try:
+        response = await client.post(endpoint, json=payload)
+    except httpx.HTTPError as e:
+        recorder.request(endpoint, time.perf_counter() - start, type(e).__name__)
+        return None
+    elapsed = time.perf_counter() - start
+    if response.status_code != 200:
+        recorder.request(endpoint, elapsed, f"HTTP {response.status_code}")
+        return None
+    recorder.request(endpoint, elapsed)
+    return response.json()
+
+
+async def run_session(client: httpx.AsyncClient, recorder: Recorder, session_id: int, args) -> None:
+    """Start one summary and send the feedback rounds on its thread."""
+    body = await timed_post(client, recorder, "/start-summarize/", {"text": make_document(session_id, args.doc_bytes)})
+    if body is None:
+        recorder.sessions_failed += 1
+        return
+    for i in range(args.feedback_rounds):
+        body = await timed_post(
+            client,
+            recorder,
+            "/submit-feedback/",
+            {"thread_id": body["thread_id"], "feedback": f"Ngắn gọn hơn, lần {i + 1}"},
+        )
+        if body is None:
+            recorder.sessions_failed += 1
+            return
+    recorder.sessions_completed += 1
+
+
+async def closed_loop(client: httpx.AsyncClient, recorder: Recorder, args, deadline: float) -> None:
+    """Keep `args.concurrency` sessions running back to back until `deadline`."""
+    counter = itertools.count()
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            await run_session(client, recorder, next(counter), args)
+
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+
+
+async def open_loop(client: httpx.AsyncClient, recorder: Recorder, args, deadline: float) -> None:
+    """Start sessions at `args.rate` per second until `deadline`, then wait for them."""
+    interval = 1.0 / args.rate
+    tasks = set()
+    session_id = 0
+    next_start = time.perf_counter()
+    while next_start < deadline:
+        task = asyncio.create_task(run_session(client, recorder, session_id, args))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+        session_id += 1
+        next_start += interval
+        await asyncio.sleep(max(0.0, next_start - time.perf_counter()))
+    if tasks:
+        await asyncio.gather(*tasks)
+
+
+async def drive(base_url: str, transport: Optional[httpx.AsyncBaseTransport], args) -> dict:
+    """Run the load against `base_url` and return the summary."""
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(base_url=base_url, transport=transport, timeout=args.timeout, limits=limits) as client:
+        sampler = asyncio.create_task(recorder.sample_rss(args.rss_interval))
+        start = time.perf_counter()
+        deadline = start + args.duration
+        if args.rate:
+            await open_loop(client, recorder, args, deadline)
+        else:
+            await closed_loop(client, recorder, args, deadline)
+        elapsed = time.perf_counter() - start
+        sampler.cancel()
+    recorder.rss.append({"t": round(time.perf_counter() - recorder.started_at, 3), "rss_bytes": current_rss_bytes()})
+    return recorder.summary(elapsed)
+
+
+# ===============================
+# 4. Chạy thử
+# ===============================
+def positive_float(value: str) -> float:
+    """Argparse type for a float greater than zero."""
+    number = float(value)
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"must be > 0, got {value}")
+    return number
+
+
+def positive_int(value: str) -> int:
+    """Argparse type for an integer greater than zero."""
+    number = int(value)
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"must be > 0, got {value}")
+    return number
+
+
+def non_negative_int(value: str) -> int:
+    """Argparse type for an integer of zero or more."""
+    number = int(value)
+    if number < 0:
+        raise argparse.ArgumentTypeError(f"must be >= 0, got {value}")
+    return number
+
+
+def parse_args(argv=None):
+    """Parse the command line."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=["inprocess", "localhost"], default="inprocess",
+                        help="inprocess: ASGI transport, no sockets; localhost: uvicorn on 127.0.0.1")
+    parser.add_argument("--url", help="target an already running server instead (real LLM backend, RSS is the client's)")
+    parser.add_argument("--concurrency", type=positive_int, default=10, help="concurrent sessions (closed loop)")
+    parser.add_argument("--rate", type=positive_float, help="new sessions per second (open loop); overrides --concurrency")
+    parser.add_argument("--duration", type=positive_float, default=30.0, help="seconds to keep starting sessions")
+    parser.add_argument("--feedback-rounds", type=non_negative_int, default=2, help="/submit-feedback/ calls per session")
+    parser.add_argument("--doc-bytes", type=positive_int, default=4000, help="approximate size of each document")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="fake LLM delay in seconds")
+    parser.add_argument("--timeout", type=float, default=60.0, help="per-request timeout in seconds")
+    parser.add_argument("--rss-interval", type=positive_float, default=0.5, help="seconds between RSS samples")
+    parser.add_argument("--label", default="", help="free-form tag stored in the result, e.g. a release version")
+    parser.add_argument("--output", help="write the JSON result to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> dict:
+    """Run the load test, print a short report and return the full result."""
+    args = parse_args(argv)
+    # Các node in tóm tắt ra stdout ở mỗi bước; bỏ đi để không làm nhiễu kết quả
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        if args.url:
+            summary = asyncio.run(drive(args.url, None, args))
+        elif args.mode == "inprocess":
+            app = load_app(args.llm_latency)
+            summary = asyncio.run(drive("http://loadtest", httpx.ASGITransport(app=app, raise_app_exceptions=False), args))
+        else:
+            with LocalServer(load_app(args.llm_latency)) as base_url:
+                summary = asyncio.run(drive(base_url, None, args))
+
+    result = {
+        "label": args.label,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "config": {k: v for k, v in vars(args).items() if k != "output"},
+        "summary": summary,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+
+    print(f"sessions: {summary['sessions_completed']} ok, {summary['sessions_failed']} failed "  # noqa: T201
+          f"({summary['sessions_per_s']:.2f}/s)")
+    for endpoint, stats in summary["endpoints"].items():
+        lat = stats["latency_s"]
+        if not stats["requests"]:
+            continue
+        line = f"{endpoint:<20} n={stats['requests']:<6} err={stats['error_rate']:.2%} rps={stats['throughput_rps']:.2f}"
+        if lat["p50"] is not None:
+            line += f" p50={lat['p50']:.3f}s p95={lat['p95']:.3f}s p99={lat['p99']:.3f}s"
+        print(line)  # noqa: T201
+    if summary["peak_rss_bytes"]:
+        print(f"peak RSS: {summary['peak_rss_bytes'] / 2**20:.1f} MiB")  # noqa: T201
+    return result
+
+
+if __name__ == "__main__":
+    main()
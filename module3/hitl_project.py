@@ -3,11 +3,13 @@ from typing import Annotated, TypedDict
 import PyPDF2
 from langchain_openai import AzureChatOpenAI
 from langchain_core.messages import HumanMessage, AnyMessage, AIMessage
+from langchain_core.runnables import RunnableConfig, RunnableLambda
 from langgraph.graph import StateGraph, START, END
 from langgraph.graph.message import add_messages
-from langgraph.checkpoint.memory import MemorySaver
 from dotenv import load_dotenv
 import os
+from doc_store import doc_store
+from request_tracing import traced, TracedMemorySaver
 
 load_dotenv()
 
@@ -18,7 +20,9 @@ endpoint = os.getenv("AZURE_OPENAI_ENDPOINT")
 # 1. Khai báo State
 # ===============================
 class State(TypedDict):
-    messages: Annotated[list[AnyMessage], add_messages]
+    # Văn bản gốc nằm trong doc_store, state chỉ giữ hash để checkpoint không phình theo độ dài tài liệu
+    doc_ref: str
+    messages: Annotated[list[AnyMessage], traced(add_messages, name="add_messages", cat="reducer")]
     
 
 # ===============================
@@ -32,20 +36,26 @@ llm = AzureChatOpenAI(
 # ===============================
 # 3. Các node chính
 # ===============================
-# Node AI: viết email trả lời
-def summarize_doc(state: State):
-    text = state["messages"][-1].content
-    feedback = ""
-    if len(state["messages"]) > 1:
-        feedbacks = [m.content for m in state["messages"][1:]]
-        feedback = "\n".join(feedbacks)
+@traced
+def build_summary_prompt(state: State):
+    text = doc_store.get(state["doc_ref"])
+    feedbacks = [m.content for m in state.get("messages", []) if isinstance(m, HumanMessage)]
+    feedback = "\n".join(feedbacks)
 
     # Prompt gốc + feedback
     prompt = f"Tóm tắt văn bản sao cho vẫn nắm được ý chính:\n\n{text}\n\n"
     if feedback:
         prompt += f"Yêu cầu chỉnh sửa bổ sung: {feedback}"
+    return [HumanMessage(content=prompt)]
+
+# Node AI: viết email trả lời
+def summarize_doc(state: State):
+    response = llm.invoke(build_summary_prompt(state))
+    return {"messages": [response]}
 
-    response = llm.invoke([HumanMessage(content=prompt)])
+# Bản async: được dùng khi graph chạy bằng ainvoke/astream_events, không chiếm thread pool
+async def asummarize_doc(state: State, config: RunnableConfig):
+    response = await llm.ainvoke(build_summary_prompt(state), config)
     return {"messages": [response]}
 
 def decide_next(state: State):
@@ -74,21 +84,24 @@ def save_summary(state: State):
 # ----------------------------
 # 3. Xây workflow
 # ----------------------------
-graph = StateGraph(State)
-graph.add_node("summarize", summarize_doc)
-graph.add_node("feedback", human_feedback)
-graph.add_node("save", save_summary)
-
-graph.add_edge(START, "summarize")
-graph.add_conditional_edges(
-    "summarize", 
-    decide_next, 
-    {"save_summary": "save", "human_feedback": "feedback"})
-graph.add_edge("feedback","summarize")    
-graph.add_edge("save", END)
-
-memory = MemorySaver()
-app_graph = graph.compile(checkpointer=memory, interrupt_after=["summarize"])
+def build_graph(summarize_node, checkpointer):
+    graph = StateGraph(State)
+    graph.add_node("summarize", summarize_node)
+    graph.add_node("feedback", human_feedback)
+    graph.add_node("save", save_summary)
+
+    graph.add_edge(START, "summarize")
+    graph.add_conditional_edges(
+        "summarize", 
+        decide_next, 
+        {"save_summary": "save", "human_feedback": "feedback"})
+    graph.add_edge("feedback","summarize")    
+    graph.add_edge("save", END)
+    return graph.compile(checkpointer=checkpointer, interrupt_after=["summarize"])
+
+memory = TracedMemorySaver()
+# name= để run bên trong node mang tên node thay vì tên hàm sync
+app_graph = build_graph(RunnableLambda(summarize_doc, afunc=asummarize_doc, name="summarize"), memory)
 
 # ----------------------------
 # 4. Chạy thử
@@ -110,7 +123,7 @@ async def main():
         print("Agent: ", end="", flush=True)
         # document = read_pdf("module3/files/LVW.pdf")
         thread = {"configurable": {"thread_id": "1"}}
-        state = {"messages": [HumanMessage(content=user_input)]}
+        state = {"doc_ref": doc_store.put(user_input)}
         async for event in app_graph.astream_events(state, thread, version="v2"):
         # Bắt sự kiện streaming từ LLM
             if event["event"] == "on_chat_model_stream" and event['metadata'].get('langgraph_node','') == "summarize":
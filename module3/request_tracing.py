@@ -0,0 +1,303 @@
+"""Per-request span tree and sampling profile, exported as Chrome trace JSON.
+
+Tracing is off unless a request turns it on (see fastapi1/health_check.py).
+While a `RequestTrace` is active in the current context it is attached to
+every LangChain/LangGraph run as a callback, so graph -> node -> LLM call
+spans are recorded without touching the call sites; `traced` and
+`TracedMemorySaver` add spans for helpers, reducers and checkpoint writes.
+When no trace is active each hook costs a single ContextVar lookup.
+
+The optional sampling profile is process-wide: it samples every thread, so
+under concurrent load it also shows stacks of other requests sharing the
+event loop and the thread pool. Only one request is profiled at a time;
+others asking for a profile get the span tree alone, with
+`profile_skipped` recorded in the trace. Samples stop being recorded after
+MAX_SAMPLES, and only the newest TRACE_MAX_FILES traces are kept on disk.
+
+The output opens in chrome://tracing or https://ui.perfetto.dev.
+"""
+
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.tracers.context import register_configure_hook
+from langgraph.checkpoint.memory import MemorySaver
+
+TRACE_DIR = os.getenv("TRACE_DIR", "traces")
+TRACE_MAX_FILES = int(os.getenv("TRACE_MAX_FILES", "200"))
+MAX_SAMPLES = 200_000
+
+current_trace: ContextVar[Optional["RequestTrace"]] = ContextVar("current_trace", default=None)
+
+SPAN_TID = 1
+# Các lane của profiler bắt đầu từ đây để không trùng với lane span
+PROFILE_TID_BASE = 1000
+
+# Chỉ một request được profile tại một thời điểm, để chỉ có một sampler thread
+profile_lock = threading.Lock()
+
+
+def now_us() -> float:
+    """Return a monotonic timestamp in microseconds."""
+    return time.perf_counter_ns() / 1000
+
+
+class SamplingProfiler:
+    """Sample the Python stacks of every other thread at a fixed interval."""
+
+    truncated = False
+
+    def __init__(self, interval: float = 0.005):
+        """Prepare a sampler thread that wakes every `interval` seconds."""
+        self.interval = interval
+        self.samples: list[tuple[float, int, tuple[str, ...]]] = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self) -> None:
+        """Start sampling."""
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop sampling and wait for the sampler thread."""
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            if len(self.samples) >= MAX_SAMPLES:
+                self.truncated = True
+                return
+            ts = now_us()
+            for tid, frame in sys._current_frames().items():
+                if tid == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                self.samples.append((ts, tid, tuple(reversed(stack))))
+
+    def to_events(self, origin: float) -> list[dict]:
+        """Turn consecutive samples into nested slices, one lane per thread (flame chart)."""
+        events = []
+        open_frames: dict[int, list[tuple[str, float]]] = {}
+        last_ts: dict[int, float] = {}
+        names = {t.ident: t.name for t in threading.enumerate()}
+
+        def close(tid: int, depth: int, ts: float) -> None:
+            frames = open_frames[tid]
+            while len(frames) > depth:
+                name, start = frames.pop()
+                events.append({"name": name, "cat": "sample", "ph": "X", "pid": 1,
+                               "tid": PROFILE_TID_BASE + tid % 100000,
+                               "ts": start - origin, "dur": ts - start})
+
+        for ts, tid, stack in self.samples:
+            frames = open_frames.setdefault(tid, [])
+            common = 0
+            while common < len(frames) and common < len(stack) and frames[common][0] == stack[common]:
+                common += 1
+            close(tid, common, ts)
+            frames.extend((name, ts) for name in stack[common:])
+            last_ts[tid] = ts
+        for tid in open_frames:
+            close(tid, 0, last_ts[tid] + self.interval * 1e6)
+            events.append({"name": "thread_name", "ph": "M", "pid": 1, "tid": PROFILE_TID_BASE + tid % 100000,
+                           "args": {"name": f"samples: {names.get(tid, tid)}"}})
+        return events
+
+
+class RequestTrace(BaseCallbackHandler):
+    """Collect the spans of one request; also a callback handler for LangChain runs."""
+
+    # Gọi trực tiếp trên thread/event loop hiện tại thay vì qua executor
+    run_inline = True
+
+    def __init__(self, name: str, profile_interval: Optional[float] = None):
+        """Start the trace clock; also start the profiler if asked and no other request holds it."""
+        self.name = name
+        self.origin = now_us()
+        self.events: list[dict] = []
+        self._open_runs: dict[UUID, tuple[str, str, float, dict]] = {}
+        self._lock = threading.Lock()
+        self.file_name = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}.json"
+        self.profiler = None
+        self.profile_skipped = False
+        self._token = None
+        if profile_interval:
+            if profile_lock.acquire(blocking=False):
+                self.profiler = SamplingProfiler(profile_interval)
+                self.profiler.start()
+            else:
+                self.profile_skipped = True
+
+    def add_span(self, name: str, cat: str, start: float, end: float, args: Optional[dict] = None) -> None:
+        """Record a complete span between two `now_us` timestamps."""
+        event = {"name": name, "cat": cat, "ph": "X", "pid": 1, "tid": SPAN_TID,
+                 "ts": start - self.origin, "dur": end - start,
+                 "args": {"thread": threading.current_thread().name, **(args or {})}}
+        with self._lock:
+            self.events.append(event)
+
+    @contextmanager
+    def span(self, name: str, cat: str = "app", **args: Any):
+        """Record the enclosed block as a span."""
+        start = now_us()
+        try:
+            yield
+        finally:
+            self.add_span(name, cat, start, now_us(), args)
+
+    # -------------------------------
+    # Callback LangChain: graph / node / LLM
+    # -------------------------------
+    def _start_run(self, name: str, cat: str, run_id: UUID, parent_run_id: Optional[UUID], tags, metadata) -> None:
+        # LangGraph đánh dấu các run nội bộ (ChannelWrite, branch...) bằng tag này
+        if tags and "langsmith:hidden" in tags:
+            return
+        args = {"run_id": str(run_id), "parent_run_id": str(parent_run_id) if parent_run_id else None}
+        if metadata and "langgraph_node" in metadata:
+            args["langgraph_node"] = metadata["langgraph_node"]
+            args["langgraph_step"] = metadata.get("langgraph_step")
+        with self._lock:
+            self._open_runs[run_id] = (name, cat, now_us(), args)
+
+    def _end_run(self, run_id: UUID, error: Optional[BaseException] = None) -> None:
+        with self._lock:
+            run = self._open_runs.pop(run_id, None)
+        if run is None:
+            return
+        name, cat, start, args = run
+        if error is not None:
+            args["error"] = repr(error)
+        self.add_span(name, cat, start, now_us(), args)
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, tags=None, metadata=None, **kwargs):
+        """Open a span for a graph (root run) or node."""
+        name = kwargs.get("name") or (serialized or {}).get("name", "chain")
+        self._start_run(name, "graph" if parent_run_id is None else "node", run_id, parent_run_id, tags, metadata)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        """Close the chain span."""
+        self._end_run(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        """Close the chain span, recording the error."""
+        self._end_run(run_id, error)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, tags=None, metadata=None, **kwargs):
+        """Open a span for a chat model call."""
+        name = kwargs.get("name") or (serialized or {}).get("name", "chat_model")
+        self._start_run(name, "llm", run_id, parent_run_id, tags, metadata)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, parent_run_id=None, tags=None, metadata=None, **kwargs):
+        """Open a span for a completion model call."""
+        name = kwargs.get("name") or (serialized or {}).get("name", "llm")
+        self._start_run(name, "llm", run_id, parent_run_id, tags, metadata)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        """Close the model span."""
+        self._end_run(run_id)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        """Close the model span, recording the error."""
+        self._end_run(run_id, error)
+
+    # -------------------------------
+    # Xuất file
+    # -------------------------------
+    def finish(self, trace_dir: Optional[str] = None) -> str:
+        """Stop the profiler and write the trace; return the file path.
+
+        This joins the sampler thread and writes the file, so callers on an
+        event loop should run it in a worker thread.
+        """
+        trace_dir = trace_dir or TRACE_DIR
+        end = now_us()
+        self.add_span(self.name, "request", self.origin, end)
+        events = [{"name": "thread_name", "ph": "M", "pid": 1, "tid": SPAN_TID, "args": {"name": "spans"}}]
+        events += self.events
+        other = {"request": self.name, "profile_skipped": self.profile_skipped}
+        if self.profiler:
+            self.profiler.stop()
+            profile_lock.release()
+            events += self.profiler.to_events(self.origin)
+            other["profile_truncated"] = self.profiler.truncated
+        os.makedirs(trace_dir, exist_ok=True)
+        path = os.path.join(trace_dir, self.file_name)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms", "otherData": other}, f)
+        prune_traces(trace_dir)
+        return path
+
+
+def prune_traces(trace_dir: str) -> None:
+    """Keep only the newest TRACE_MAX_FILES trace files in `trace_dir`."""
+    files = sorted(
+        (entry.stat().st_mtime, entry.path)
+        for entry in os.scandir(trace_dir)
+        if entry.is_file() and entry.name.endswith(".json")
+    )
+    for _, path in files[:-TRACE_MAX_FILES]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+# Khi current_trace có giá trị, LangChain tự gắn nó vào callbacks của mọi run con
+register_configure_hook(current_trace, inheritable=True)
+
+
+def start_trace(name: str, profile_interval: Optional[float] = None) -> RequestTrace:
+    """Activate a new trace in the current context."""
+    trace = RequestTrace(name, profile_interval)
+    trace._token = current_trace.set(trace)
+    return trace
+
+
+def stop_trace(trace: RequestTrace) -> None:
+    """Deactivate `trace` in the current context; spans are no longer added to it."""
+    current_trace.reset(trace._token)
+
+
+def traced(fn=None, *, name: Optional[str] = None, cat: str = "app"):
+    """Record a span around `fn` when a trace is active; a plain call otherwise."""
+    if fn is None:
+        return functools.partial(traced, name=name, cat=cat)
+    span_name = name or fn.__name__
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        trace = current_trace.get()
+        if trace is None:
+            return fn(*args, **kwargs)
+        with trace.span(span_name, cat):
+            return fn(*args, **kwargs)
+
+    return wrapper
+
+
+class TracedMemorySaver(MemorySaver):
+    """MemorySaver that records checkpoint writes (incl. serialization) as spans."""
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        """Save the checkpoint, recording a span when a trace is active."""
+        trace = current_trace.get()
+        if trace is None:
+            return super().put(config, checkpoint, metadata, new_versions)
+        with trace.span("checkpointer.put", "checkpoint", step=metadata.get("step")):
+            return super().put(config, checkpoint, metadata, new_versions)
@@ -5,6 +5,7 @@ from langgraph.graph import StateGraph, START, END
 from typing_extensions import TypedDict
 from typing import List
 from langchain_core.messages import HumanMessage, AIMessage, AnyMessage
+from langchain_core.runnables import RunnableConfig, RunnableLambda
 from langgraph.graph.message import add_messages
 from typing import Annotated
 import asyncio
@@ -26,11 +27,16 @@ def call_llm(state: State):
     response = llm.invoke(state["messages"])
     return {"messages": [response]}
 
+# Bản async: astream_events sẽ gọi hàm này thay vì đẩy call_llm sang thread pool
+async def acall_llm(state: State, config: RunnableConfig):
+    response = await llm.ainvoke(state["messages"], config)
+    return {"messages": [response]}
+
 # -------------------------------
 # 4. Xây dựng graph
 # -------------------------------
 workflow = StateGraph(State)
-workflow.add_node("chatbot", call_llm)
+workflow.add_node("chatbot", RunnableLambda(call_llm, afunc=acall_llm, name="chatbot"))
 workflow.add_edge(START, "chatbot")
 workflow.add_edge("chatbot", END)
 
@@ -5,6 +5,7 @@ from typing import List
 from langchain_core.messages import AnyMessage
 from langgraph.graph.message import add_messages
 from langgraph.checkpoint.memory import MemorySaver
+from langchain_core.runnables import RunnableConfig, RunnableLambda
 import asyncio
 from dotenv import load_dotenv
 import os
@@ -27,8 +28,13 @@ def chatbot_node(state: State):
     response = llm.invoke(state["messages"])
     return {"messages": [response]}
 
+# Khi chạy bằng astream_events, LangGraph await hàm này nên event loop không bị chặn
+async def achatbot_node(state: State, config: RunnableConfig):
+    response = await llm.ainvoke(state["messages"], config)
+    return {"messages": [response]}
+
 workflow = StateGraph(State)
-workflow.add_node("chatbot", chatbot_node)
+workflow.add_node("chatbot", RunnableLambda(chatbot_node, afunc=achatbot_node, name="chatbot"))
 workflow.add_edge(START, "chatbot")
 workflow.add_edge("chatbot", END)
 memory=MemorySaver()
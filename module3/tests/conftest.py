@@ -0,0 +1,20 @@
+import pytest
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    from fake_llm import use_fake_backend
+
+    hitl_project = use_fake_backend(latency=0)
+
+    from fastapi.testclient import TestClient
+
+    import doc_store
+    from health_check import app
+
+    store = doc_store.DocumentStore(str(tmp_path / "docs"))
+    monkeypatch.setattr(hitl_project, "doc_store", store)
+    monkeypatch.setattr("health_check.doc_store", store)
+    with TestClient(app) as c:
+        c.store = store
+        yield c
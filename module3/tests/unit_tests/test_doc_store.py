@@ -0,0 +1,74 @@
+from doc_store import DocumentStore
+
+
+def test_put_is_content_addressed(tmp_path) -> None:
+    store = DocumentStore(str(tmp_path))
+    ref = store.put("hello")
+    assert store.put("hello") == ref
+    assert store.put("world") != ref
+    assert store.get(ref) == "hello"
+
+
+def test_spilled_documents_are_read_back(tmp_path) -> None:
+    store = DocumentStore(str(tmp_path), max_memory_bytes=8)
+    small = store.put("abc")
+    big = store.put("x" * 100)
+    other = store.put("defgh12")
+    assert (tmp_path / f"{big}.txt").exists()
+    assert (tmp_path / f"{small}.txt").exists()
+    assert store.get(small) == "abc"
+    assert store.get(big) == "x" * 100
+    assert store.get(other) == "defgh12"
+
+
+def test_disk_tier_drops_least_recently_used(tmp_path) -> None:
+    store = DocumentStore(str(tmp_path), max_memory_bytes=0, max_disk_bytes=25)
+    first = store.put("a" * 10)
+    second = store.put("b" * 10)
+    store.get(first)
+    third = store.put("c" * 10)
+    assert second not in store
+    assert not (tmp_path / f"{second}.txt").exists()
+    assert store.get(first) == "a" * 10
+    assert store.get(third) == "c" * 10
+    try:
+        store.get(second)
+    except KeyError:
+        pass
+    else:
+        raise AssertionError("dropped document is still readable")
+
+
+def test_delete_and_reload(tmp_path) -> None:
+    store = DocumentStore(str(tmp_path), max_memory_bytes=0)
+    kept = store.put("kept")
+    gone = store.put("gone")
+    store.delete(gone)
+    assert gone not in store
+    assert not (tmp_path / f"{gone}.txt").exists()
+
+    reopened = DocumentStore(str(tmp_path))
+    assert reopened.get(kept) == "kept"
+    assert gone not in reopened
+
+
+def test_default_spill_dir_is_per_store() -> None:
+    first = DocumentStore(max_memory_bytes=0)
+    second = DocumentStore(max_memory_bytes=0, max_disk_bytes=1)
+    ref = first.put("a" * 10)
+    second.put("b" * 10)
+    assert first.spill_dir != second.spill_dir
+    assert first.get(ref) == "a" * 10
+
+
+def test_missing_spill_file_is_not_contained(tmp_path) -> None:
+    store = DocumentStore(str(tmp_path), max_memory_bytes=0)
+    ref = store.put("abc")
+    (tmp_path / f"{ref}.txt").unlink()
+    assert ref not in store
+    try:
+        store.get(ref)
+    except KeyError:
+        pass
+    else:
+        raise AssertionError("missing file is still readable")
@@ -0,0 +1,29 @@
+def test_summarize_then_feedback(client) -> None:
+    r = client.post("/start-summarize/", json={"text": "Một văn bản ngắn."})
+    assert r.status_code == 200
+    r = client.post("/submit-feedback/", json={"thread_id": r.json()["thread_id"], "feedback": "ngắn hơn"})
+    assert r.status_code == 200
+    assert r.json()["summary"]
+
+
+def test_feedback_for_unknown_thread_is_404(client) -> None:
+    r = client.post("/submit-feedback/", json={"thread_id": "does-not-exist", "feedback": "x"})
+    assert r.status_code == 404
+
+
+def test_feedback_after_document_dropped_is_404(client) -> None:
+    r = client.post("/start-summarize/", json={"text": "Văn bản sẽ bị xoá."})
+    thread_id = r.json()["thread_id"]
+    for ref in list(client.store._memory):
+        client.store.delete(ref)
+    r = client.post("/submit-feedback/", json={"thread_id": thread_id, "feedback": "x"})
+    assert r.status_code == 404
+
+
+def test_feedback_after_spill_file_removed_is_404(client, tmp_path) -> None:
+    client.store.max_memory_bytes = 0
+    r = client.post("/start-summarize/", json={"text": "Văn bản nằm trên đĩa."})
+    for path in (tmp_path / "docs").glob("*.txt"):
+        path.unlink()
+    r = client.post("/submit-feedback/", json={"thread_id": r.json()["thread_id"], "feedback": "x"})
+    assert r.status_code == 404
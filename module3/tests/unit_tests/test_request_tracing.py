@@ -0,0 +1,129 @@
+import json
+
+import pytest
+
+import request_tracing
+from request_tracing import SamplingProfiler
+
+
+def slices(events, tid):
+    return sorted(
+        (e["name"], e["ts"], e["dur"]) for e in events if e.get("cat") == "sample" and e["tid"] == tid
+    )
+
+
+def test_to_events_nests_consecutive_samples() -> None:
+    profiler = SamplingProfiler(interval=0.001)
+    profiler.samples = [
+        (100.0, 7, ("main", "a")),
+        (1100.0, 7, ("main", "a", "b")),
+        (2100.0, 7, ("main", "c")),
+        (100.0, 8, ("worker",)),
+    ]
+    events = profiler.to_events(origin=100.0)
+
+    lane = request_tracing.PROFILE_TID_BASE + 7
+    assert slices(events, lane) == [
+        ("a", 0.0, 2000.0),
+        ("b", 1000.0, 1000.0),
+        ("c", 2000.0, 1000.0),
+        ("main", 0.0, 3000.0),
+    ]
+    assert slices(events, request_tracing.PROFILE_TID_BASE + 8) == [("worker", 0.0, 1000.0)]
+    assert sum(e["ph"] == "M" for e in events) == 2
+
+
+def test_only_one_request_is_profiled_at_a_time(tmp_path) -> None:
+    first = request_tracing.RequestTrace("first", profile_interval=0.01)
+    second = request_tracing.RequestTrace("second", profile_interval=0.01)
+    assert first.profiler is not None
+    assert second.profiler is None and second.profile_skipped
+    second.finish(str(tmp_path))
+    first.finish(str(tmp_path))
+    third = request_tracing.RequestTrace("third", profile_interval=0.01)
+    assert third.profiler is not None
+    third.finish(str(tmp_path))
+
+
+def test_old_trace_files_are_pruned(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(request_tracing, "TRACE_MAX_FILES", 2)
+    for i in range(4):
+        request_tracing.RequestTrace(f"r{i}").finish(str(tmp_path))
+    assert len(list(tmp_path.glob("*.json"))) == 2
+
+
+@pytest.fixture
+def traced_client(client, monkeypatch, tmp_path):
+    import health_check
+
+    monkeypatch.setattr(health_check, "TRACE_ADMIN_TOKEN", "secret")
+    monkeypatch.setattr(health_check, "tracing", health_check.TracingSettings())
+    monkeypatch.setattr(request_tracing, "TRACE_DIR", str(tmp_path / "traces"))
+    client.trace_dir = tmp_path / "traces"
+    return client
+
+
+def load_trace(client, response):
+    return json.loads((client.trace_dir / response.headers["x-trace-file"]).read_text())["traceEvents"]
+
+
+def test_header_traces_request(traced_client) -> None:
+    r = traced_client.post(
+        "/start-summarize/", json={"text": "abc"}, headers={"X-Trace": "1", "X-Trace-Token": "secret"}
+    )
+    assert r.status_code == 200
+    cats = {e.get("cat") for e in load_trace(traced_client, r)}
+    assert {"request", "graph", "node", "llm", "checkpoint", "reducer"} <= cats
+    assert "sample" not in cats
+
+
+def test_header_profile_adds_samples(traced_client, monkeypatch) -> None:
+    import hitl_project
+    from fake_llm import FakeChatModel
+
+    # Cần request kéo dài hơn vài chu kỳ lấy mẫu
+    monkeypatch.setattr(hitl_project, "llm", FakeChatModel(latency=0.05))
+    r = traced_client.post(
+        "/start-summarize/", json={"text": "abc"}, headers={"X-Trace": "profile", "X-Trace-Token": "secret"}
+    )
+    assert r.status_code == 200
+    assert any(e.get("cat") == "sample" for e in load_trace(traced_client, r))
+
+
+@pytest.mark.parametrize(
+    "headers",
+    [
+        {"X-Trace": "1"},
+        {"X-Trace": "1", "X-Trace-Token": "wrong"},
+        {"X-Trace": "0", "X-Trace-Token": "secret"},
+        {"X-Trace": "false", "X-Trace-Token": "secret"},
+    ],
+)
+def test_header_without_valid_request_is_ignored(traced_client, headers) -> None:
+    r = traced_client.get("/health", headers=headers)
+    assert r.status_code == 200
+    assert "x-trace-file" not in r.headers
+    assert not traced_client.trace_dir.exists()
+
+
+def test_tracing_is_off_without_admin_token(client, monkeypatch) -> None:
+    import health_check
+
+    monkeypatch.setattr(health_check, "TRACE_ADMIN_TOKEN", None)
+    r = client.get("/health", headers={"X-Trace": "1", "X-Trace-Token": "secret"})
+    assert "x-trace-file" not in r.headers
+    assert client.post("/admin/tracing", json={"enabled": True}).status_code == 404
+
+
+def test_admin_toggle(traced_client) -> None:
+    auth = {"X-Trace-Token": "secret"}
+    assert traced_client.post("/admin/tracing", json={"enabled": True}).status_code == 403
+    assert traced_client.post("/admin/tracing", json={"enabled": True, "sample_interval_ms": -1}, headers=auth).status_code == 422
+    assert traced_client.post("/admin/tracing", json={"enabled": True, "sample_interval_ms": 0}, headers=auth).status_code == 422
+
+    assert traced_client.post("/admin/tracing", json={"enabled": True}, headers=auth).status_code == 200
+    assert traced_client.get("/admin/tracing", headers=auth).json()["enabled"] is True
+    assert "x-trace-file" in traced_client.get("/health").headers
+
+    traced_client.post("/admin/tracing", json={"enabled": False}, headers=auth)
+    assert "x-trace-file" not in traced_client.get("/health").headers
@@ -0,0 +1 @@
+../module3/doc_store.py
\ No newline at end of file
@@ -4,6 +4,7 @@ from langgraph.graph import StateGraph, START,END
 from langchain_openai import AzureChatOpenAI
 from langgraph.graph.message import add_messages
 from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import RunnableConfig, RunnableLambda
 
 # -----------------------------
 # Định nghĩa State
@@ -27,15 +28,23 @@ llm = AzureChatOpenAI(
 # -----------------------------
 
 
-def generate_summary(state: GraphState) -> GraphState:
+def summary_prompt(state: GraphState):
     prompt_summary = "Bạn là một trợ lý AI. Nhiệm vụ của bạn là tóm tắt hội thoại."
+    return [HumanMessage(content=prompt_summary)]
+
+
+def generate_summary(state: GraphState) -> GraphState:
+    resp = llm.invoke(summary_prompt(state))
+    return {"summary": resp.content}
+
 
-    resp = llm.invoke(HumanMessage(content=prompt_summary))
+async def agenerate_summary(state: GraphState, config: RunnableConfig) -> GraphState:
+    resp = await llm.ainvoke(summary_prompt(state), config)
     return {"summary": resp.content}
 
 
 sg = StateGraph(GraphState)
-sg.add_node("generate_summary", generate_summary)
+sg.add_node("generate_summary", RunnableLambda(generate_summary, afunc=agenerate_summary, name="generate_summary"))
 sg.set_entry_point("generate_summary")
 sg.set_finish_point("generate_summary") 
 sub_app1 = sg.compile()
@@ -45,15 +54,23 @@ sub_app1 = sg.compile()
 # Sub-graph: Generate Title
 # -----------------------------
 
-def generate_title(state: GraphState) -> GraphState:
+def title_prompt(state: GraphState):
     prompt_title = "Bạn là một AI tạo tiêu đề ngắn gọn. Hãy viết tiêu đề cho bản tóm tắt sau:\n\n{summary}"
+    return [HumanMessage(content=prompt_title.format(summary=state.get("summary","")))]
+
+
+def generate_title(state: GraphState) -> GraphState:
+    resp = llm.invoke(title_prompt(state))
+    return {"title": resp.content}
+
 
-    resp = llm.invoke(HumanMessage(content=prompt_title) + state.get("summary",""))
+async def agenerate_title(state: GraphState, config: RunnableConfig) -> GraphState:
+    resp = await llm.ainvoke(title_prompt(state), config)
     return {"title": resp.content}
 
 
 tg = StateGraph(GraphState)
-tg.add_node("generate_title", generate_title)
+tg.add_node("generate_title", RunnableLambda(generate_title, afunc=agenerate_title, name="generate_title"))
 tg.set_entry_point("generate_title")
 tg.set_finish_point("generate_title")
 sub_app2 = tg.compile()
@@ -1,13 +1,15 @@
 from typing import List, TypedDict, Annotated, Literal
 from langchain_openai import AzureChatOpenAI
-from langgraph.prebuilt import ToolNode, tools_condition
+from langgraph.prebuilt import ToolNode, tools_condition, InjectedState
 from langgraph.graph import StateGraph, END, START
 from langgraph.graph.message import add_messages
 from langchain_core.messages import SystemMessage, HumanMessage, AnyMessage
 import os
-from langchain_core.tools import tool
+from langchain_core.tools import StructuredTool
+from langchain_core.runnables import RunnableConfig, RunnableLambda
 from langgraph.checkpoint.memory import MemorySaver
 from dotenv import load_dotenv
+from doc_store import doc_store
 
 load_dotenv()
 
@@ -17,6 +19,7 @@ endpoint = os.getenv("AZURE_OPENAI_ENDPOINT")
 # 1. Khai báo state
 # ==============================
 class GraphState(TypedDict):
+    doc_ref: str  # hash do doc_store.put trả về
     messages: Annotated[AnyMessage, add_messages]
     summary: str
     title: str
@@ -41,15 +44,9 @@ llm = AzureChatOpenAI(
 
 #=== SUMMARY NODE ===
 
-@tool
-def generate_summary(state: dict):
-    '''This node will summary a paragraph from the user input'''
-    # Access the latest human message content as the text to summarize
-    text_to_process = ""
-    for message in state["messages"]:
-       if isinstance(message, HumanMessage) and not message.content.lower().startswith("feedback summary:", "feedback_title"):
-        text_to_process = message.content
-        break
+def summary_prompt(state: dict) -> list[HumanMessage]:
+    # Resolve the original text from the document store
+    text_to_process = doc_store.get(state["doc_ref"])
 
     # Access the latest feedback on the summary if available
     feedback_summary = ""
@@ -63,23 +60,23 @@ def generate_summary(state: dict):
 
     if feedback_summary:
         prompt_summary += f"\nAdditional requirements for the summary: {feedback_summary}"
+    return [HumanMessage(content=prompt_summary)]
 
-    response = llm.invoke(HumanMessage(content=prompt_summary))
+def generate_summary(state: Annotated[dict, InjectedState]):
+    '''This node will summary a paragraph from the user input'''
+    response = llm.invoke(summary_prompt(state))
     return {"summary": response.content}
 
-#=== TITLE NODE ===
-
-@tool
-def generate_title(state: dict):
-    '''This node will add title based on paragraph'''
-    # # Access the latest human message content as the original text
-    text = ""
-    for message in state["messages"]:
-        if isinstance(message, HumanMessage) and not message.content.lower().startswith("feedback_summary","feedback title:"):
-           text = message.content
-           break
+async def agenerate_summary(state: Annotated[dict, InjectedState], config: RunnableConfig):
+    '''This node will summary a paragraph from the user input'''
+    response = await llm.ainvoke(summary_prompt(state), config)
+    return {"summary": response.content}
 
+#=== TITLE NODE ===
 
+def title_prompt(state: dict) -> list[HumanMessage]:
+    # Resolve the original text from the document store
+    text = doc_store.get(state["doc_ref"])
 
     # Access the latest feedback on the title if available
     feedback_title = ""
@@ -92,8 +89,16 @@ def generate_title(state: dict):
 
     if feedback_title:
         prompt_title += f"\nAdditional requirement for the title: {feedback_title}"
+    return [HumanMessage(content=prompt_title)]
 
-    response = llm.invoke(HumanMessage(content=prompt_title))
+def generate_title(state: Annotated[dict, InjectedState]):
+    '''This node will add title based on paragraph'''
+    response = llm.invoke(title_prompt(state))
+    return {"title": response.content}
+
+async def agenerate_title(state: Annotated[dict, InjectedState], config: RunnableConfig):
+    '''This node will add title based on paragraph'''
+    response = await llm.ainvoke(title_prompt(state), config)
     return {"title": response.content}
 
 #=== SUPERVISOR NODE ===
@@ -105,7 +110,11 @@ If the message state has a feedback that refines the summary (starts with "Feedb
 If the message state has a feedback that refines the title (starts with "Feedback title:"), then call tool generate_title to update the title based on the feedback.
 """
 
-tools = [generate_summary, generate_title]
+# ToolNode gọi coroutine khi graph chạy async, func khi chạy sync
+tools = [
+    StructuredTool.from_function(func=generate_summary, coroutine=agenerate_summary),
+    StructuredTool.from_function(func=generate_title, coroutine=agenerate_title),
+]
 llm_with_tools= llm.bind_tools(tools, parallel_tool_calls=False)
 def supervisor(state: dict):
     title = state.get("title", "")
@@ -113,6 +122,12 @@ def supervisor(state: dict):
     response = llm_with_tools.invoke([SystemMessage(content=supervisor_prompt)] + state["messages"])
     return {"messages": response, "summary": summary, "title": title}
 
+async def asupervisor(state: dict, config: RunnableConfig):
+    title = state.get("title", "")
+    summary = state.get("summary", "")
+    response = await llm_with_tools.ainvoke([SystemMessage(content=supervisor_prompt)] + state["messages"], config)
+    return {"messages": response, "summary": summary, "title": title}
+
 def route_supervisor(state: dict) -> Literal["tools", "val"]:
     latest_message = state["messages"][-1]
     if hasattr(latest_message, "tool_calls") and latest_message.tool_calls:
@@ -161,7 +176,7 @@ from langgraph.checkpoint.memory import MemorySaver
 
 builder = StateGraph(GraphState)
 
-builder.add_node("supervisor", supervisor)
+builder.add_node("supervisor", RunnableLambda(supervisor, afunc=asupervisor, name="supervisor"))
 builder.add_node("tools", ToolNode(tools))
 builder.add_node("val", val)
 
@@ -181,7 +196,8 @@ if __name__ == "__main__":
     user_input = input("Your input: ")
     if user_input.lower() == "exit":
       break
-    input_state = {'messages':[HumanMessage(content=user_input)]}
+    doc_ref = doc_store.put(user_input)
+    input_state = {'doc_ref': doc_ref, 'messages':[HumanMessage(content=f"Summarize and add title for document {doc_ref}")]}
     config={"configurable": {"thread_id": "1"}}
     # The initial state should be just the user message.
     # The supervisor will handle routing based on the state.
@@ -1,5 +1,12 @@
+import os
+
 import pytest
 
+# AzureChatOpenAI only needs these to be constructed; tests swap in a fake model
+os.environ.setdefault("AZURE_OPENAI_API_KEY", "fake")
+os.environ.setdefault("AZURE_OPENAI_ENDPOINT", "http://127.0.0.1")
+os.environ.setdefault("OPENAI_API_VERSION", "2025-01-01-preview")
+
 
 @pytest.fixture(scope="session")
 def anyio_backend():
@@ -0,0 +1,61 @@
+import importlib
+
+import pytest
+from langchain_core.language_models import FakeListChatModel
+from langchain_core.messages import HumanMessage
+
+import summary
+from doc_store import DocumentStore
+
+graph_module = importlib.import_module("agent.graph")
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    llm = FakeListChatModel(responses=["ok"])
+    monkeypatch.setattr(graph_module, "llm", llm)
+    monkeypatch.setattr(summary, "llm", llm)
+    return llm
+
+
+@pytest.fixture
+def doc_state(monkeypatch, tmp_path):
+    store = DocumentStore(str(tmp_path))
+    monkeypatch.setattr(summary, "doc_store", store)
+    return {
+        "doc_ref": store.put("Một đoạn văn cần tóm tắt."),
+        "messages": [HumanMessage(content="Feedback title: ngắn hơn")],
+    }
+
+
+def test_title_prompt_includes_summary() -> None:
+    [message] = graph_module.title_prompt({"summary": "Tóm tắt mẫu"})
+    assert "Tóm tắt mẫu" in message.content
+    assert "{summary}" not in message.content
+
+
+def test_graph_generators(fake_llm) -> None:
+    assert graph_module.generate_summary({}) == {"summary": "ok"}
+    assert graph_module.generate_title({"summary": "s"}) == {"title": "ok"}
+
+
+@pytest.mark.anyio
+async def test_graph_async_generators(fake_llm) -> None:
+    assert await graph_module.agenerate_summary({}, {}) == {"summary": "ok"}
+    assert await graph_module.agenerate_title({"summary": "s"}, {}) == {"title": "ok"}
+
+
+def test_summary_tools(fake_llm, doc_state) -> None:
+    summary_tool, title_tool = summary.tools
+    assert summary_tool.invoke({"state": doc_state}) == {"summary": "ok"}
+    assert title_tool.invoke({"state": doc_state}) == {"title": "ok"}
+    [prompt] = summary.title_prompt(doc_state)
+    assert "Một đoạn văn cần tóm tắt." in prompt.content
+    assert "ngắn hơn" in prompt.content
+
+
+@pytest.mark.anyio
+async def test_summary_tools_async(fake_llm, doc_state) -> None:
+    summary_tool, title_tool = summary.tools
+    assert await summary_tool.ainvoke({"state": doc_state}) == {"summary": "ok"}
+    assert await title_tool.ainvoke({"state": doc_state}) == {"title": "ok"}